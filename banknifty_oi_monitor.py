@@ -1,11 +1,29 @@
 import os
+import atexit
+import functools
+import hashlib
 import json
+import logging
+import logging.handlers
+import mmap
+import pickle
+import queue
+import sys
+import threading
 import time
-import pandas as pd
+import numpy as np
 import requests
-from datetime import datetime, timedelta, timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone, time as dtime
 from fyers_apiv3 import fyersModel
 
+try:
+    import orjson
+except ImportError:  # optional — only speeds up the DEBUG_MODE JSON snapshot
+    orjson = None
+
 # ================= CONFIG =================
 WATCH_OI_PCT = 120  # Static - simple and effective
 EXEC_OI_PCT = 200   # Static - catches real institutional moves
@@ -14,7 +32,11 @@ VOL_MULTIPLIER = 1.5
 MIN_BASE_OI = 2000
 STRIKE_RANGE = 200
 CHECK_MARKET_HOURS = False # set to True in production
-BASELINE_FILE = "bn_baseline_oi.json"
+BASELINE_FILE = "bn_baseline_oi.pkl"
+BASELINE_DEBUG_FILE = "bn_baseline_oi.debug.json"  # human-readable copy, written only in DEBUG_MODE
+TELEGRAM_MAX_PER_SEC = 30
+TELEGRAM_MAX_CHARS = 4000  # Telegram caps a message at 4096 chars; keep headroom for emoji
+TELEGRAM_QUEUE_MAX = 100
 
 # ─── Quality filters ───
 OI_BOTH_SIDES_AVOID = 180  # % if both CE & PE >= this → skip conflicted/range-bound
@@ -24,9 +46,25 @@ MIN_CUMULATIVE_DECLINE_PCT = -10  # NEW: Cumulative decline threshold (for alrea
 
 DEBUG_MODE = str(os.environ.get("DEBUG_MODE", "false")).lower() == "true"
 
+# ================= LOGGING =================
+# Diagnostics go through log.debug so they are neither formatted nor written unless DEBUG_MODE
+# Records are buffered and written to stdout in one go at the end of each scan (or on ERROR)
+_log_stream = logging.StreamHandler(sys.stdout)
+_log_stream.setFormatter(logging.Formatter("%(message)s"))
+_log_buffer = logging.handlers.MemoryHandler(capacity=512, flushLevel=logging.ERROR, target=_log_stream)
+logging.basicConfig(
+    level=logging.DEBUG if DEBUG_MODE else logging.INFO,
+    handlers=[_log_buffer]
+)
+log = logging.getLogger("bn_oi_monitor")
+
 # ================= TIMEZONE =================
 IST = timezone(timedelta(hours=5, minutes=30))
 
+MARKET_OPEN  = dtime(9, 15)
+MARKET_CLOSE = dtime(15, 30)
+EXEC_AFTER   = dtime(10, 15)
+
 # ================= SECRETS =================
 CLIENT_ID = os.environ.get("CLIENT_ID")
 ACCESS_TOKEN = os.environ.get("ACCESS_TOKEN")
@@ -43,61 +81,185 @@ fyers = fyersModel.FyersModel(
     log_path=""
 )
 
+# ================= HTTP =================
+# One keep-alive pool for all Telegram calls in a run: the TLS handshake is paid once
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.2)
+))
+
 # ================= HELPERS =================
 def now_ist():
     return datetime.now(IST)
 
-def is_market_open():
-    t = now_ist().time()
-    return datetime.strptime("09:15", "%H:%M").time() <= t <= datetime.strptime("15:30", "%H:%M").time()
+# Time checks take an optional wall-clock time so a scan can evaluate them all against one now_ist()
+def is_market_open(t=None):
+    if t is None:
+        t = now_ist().time()
+    return MARKET_OPEN <= t <= MARKET_CLOSE
 
-def after_1015():
-    return now_ist().time() >= datetime.strptime("10:15", "%H:%M").time()
+def after_1015(t=None):
+    if t is None:
+        t = now_ist().time()
+    return t >= EXEC_AFTER
 
-def send_telegram(msg):
-    if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
-        return
+def _post_telegram(msg):
     try:
-        requests.post(
+        _session.post(
             f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage",
             data={"chat_id": TELEGRAM_CHAT_ID, "text": msg, "parse_mode": "Markdown"},
             timeout=10
         )
     except Exception as e:
-        print("Telegram error:", e)
+        log.warning("Telegram error: %s", e)
 
-def safe_api_call(fn, payload, retries=3, delay=1):
-    for _ in range(retries):
+def _telegram_worker():
+    # Drains queued alerts off the scan path, spaced to Telegram's 30 msg/s limit
+    last_sent = 0.0
+    while True:
+        msg = _alert_q.get()
+        try:
+            wait = last_sent + 1 / TELEGRAM_MAX_PER_SEC - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            last_sent = time.monotonic()
+            _post_telegram(msg)
+        finally:
+            _alert_q.task_done()
+
+_alert_q = queue.Queue(maxsize=TELEGRAM_QUEUE_MAX)
+threading.Thread(target=_telegram_worker, name="telegram", daemon=True).start()
+# The worker is a daemon thread — make sure queued alerts go out before the process exits
+atexit.register(_alert_q.join)
+
+def send_telegram(msg):
+    if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
+        return
+    # Bounded queue: if Telegram is unreachable, shed the stalest alert rather than grow without limit
+    while True:
+        try:
+            _alert_q.put_nowait(msg)
+            return
+        except queue.Full:
+            try:
+                _alert_q.get_nowait()
+                _alert_q.task_done()
+                log.warning("Telegram queue full — dropped oldest alert")
+            except queue.Empty:
+                pass
+
+# Alerts raised during a scan are buffered and flushed as one sendMessage at the end
+_TELEGRAM_SEP = "\n\n─────\n\n"
+_pending_msgs = []
+
+def queue_telegram(msg):
+    _pending_msgs.append(msg)
+
+def flush_telegram():
+    batch, size = [], 0
+    for msg in _pending_msgs:
+        msg = msg[:TELEGRAM_MAX_CHARS]
+        extra = len(msg) + (len(_TELEGRAM_SEP) if batch else 0)
+        if batch and size + extra > TELEGRAM_MAX_CHARS:
+            send_telegram(_TELEGRAM_SEP.join(batch))
+            batch, size, extra = [], 0, len(msg)
+        batch.append(msg)
+        size += extra
+    if batch:
+        send_telegram(_TELEGRAM_SEP.join(batch))
+    _pending_msgs.clear()
+
+def safe_api_call(fn, payload, retries=3, backoff=0.5):
+    # Retries exceptions, rate limits and malformed responses with exponential backoff
+    for attempt in range(retries):
         try:
             resp = fn(payload)
             if resp and ("d" in resp or "data" in resp):
                 return resp
-        except Exception:
-            time.sleep(delay)
+            if resp and resp.get("code") == 429:
+                log.debug("FYERS rate limited (attempt %d/%d)", attempt + 1, retries)
+            else:
+                log.debug("Unexpected FYERS response (attempt %d/%d): %s", attempt + 1, retries, resp)
+        except Exception as e:
+            log.debug("FYERS call failed (attempt %d/%d): %s", attempt + 1, retries, e)
+        if attempt < retries - 1:
+            time.sleep(backoff * 2 ** attempt)
     return None
 
 # ================= SAFE SPOT FETCH =================
-def get_banknifty_spot():
-    resp = safe_api_call(fyers.quotes, {"symbols": "NSE:NIFTYBANK-INDEX"})
+def get_spots(symbols):
+    # One quotes call for any number of symbols (FYERS accepts up to 50, comma-separated)
+    resp = safe_api_call(fyers.quotes, {"symbols": ",".join(symbols)})
     if not resp or "d" not in resp or not resp["d"]:
-        return None
+        return {}
 
-    try:
-        v = resp["d"][0].get("v", {})
-        lp = v.get("lp") or v.get("ltp") or v.get("prev_close_price")
-        if lp is None or lp == 0:
-            return None
-        return float(lp)
-    except Exception:
-        if DEBUG_MODE:
-            print("❌ Spot parse error:", resp)
-        return None
+    spots = {}
+    for q in resp["d"]:
+        try:
+            v = q.get("v", {})
+            lp = v.get("lp") or v.get("ltp") or v.get("prev_close_price")
+            if lp:
+                spots[q.get("n") or v.get("symbol")] = float(lp)
+        except Exception:
+            log.debug("❌ Spot parse error: %s", q)
+    return spots
+
+def get_banknifty_spot():
+    return get_spots(["NSE:NIFTYBANK-INDEX"]).get("NSE:NIFTYBANK-INDEX")
+
+def spot_from_chain(raw):
+    # FYERS lists the underlying as an optionsChain row of its own (strike_price -1), normally first
+    for r in raw:
+        if r.get("symbol") == "NSE:NIFTYBANK-INDEX":
+            lp = r.get("ltp")
+            return float(lp) if lp else None
+    return None
 
 # ================= BASELINE =================
+_load_cache = [None, None]  # [mtime_ns, baseline] of the last file parsed or written
+_saved_digest = [None]  # blake2b of the bytes currently on disk
+
+def _digest(payload):
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+@dataclass(slots=True)
+class StrikeEntry:
+    base_oi: int
+    base_ltp: float
+    base_vol: int
+    prev_oi: int
+    state: str = "NONE"
+
+    @classmethod
+    def from_dict(cls, d):
+        # Entries written before prev_oi was tracked fall back to the baseline OI
+        return cls(d["base_oi"], d["base_ltp"], d["base_vol"], d.get("prev_oi", d["base_oi"]), d.get("state", "NONE"))
+
+    def to_dict(self):
+        return {"base_oi": self.base_oi, "base_ltp": self.base_ltp, "base_vol": self.base_vol,
+                "prev_oi": self.prev_oi, "state": self.state}
+
+# On disk the entries stay plain dicts, so the file unpickles without importing this module
+def _baseline_from_plain(b):
+    b["data"] = {k: StrikeEntry.from_dict(d) for k, d in b["data"].items()}
+    return b
+
+def _baseline_to_plain(b):
+    return {**b, "data": {k: e.to_dict() for k, e in b["data"].items()}}
+
 def load_baseline():
-    if os.path.exists(BASELINE_FILE):
-        with open(BASELINE_FILE, "r") as f:
-            return json.load(f)
+    st = os.stat(BASELINE_FILE) if os.path.exists(BASELINE_FILE) else None
+    if st is not None and st.st_size:
+        if _load_cache[0] == st.st_mtime_ns:
+            return _load_cache[1]
+        # Unpickle and hash straight from the page cache instead of copying the file into a bytes
+        with open(BASELINE_FILE, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            b = _baseline_from_plain(pickle.loads(mm))
+            _saved_digest[0] = _digest(mm)
+        _load_cache[:] = [st.st_mtime_ns, b]
+        return b
     return {
         "date": None,
         "started": False,
@@ -106,49 +268,117 @@ def load_baseline():
     }
 
 def save_baseline(b):
-    with open(BASELINE_FILE, "w") as f:
-        json.dump(b, f, indent=2)
-
-def reset_day(b):
-    today = now_ist().date().isoformat()
+    plain = _baseline_to_plain(b)
+    payload = pickle.dumps(plain, protocol=pickle.HIGHEST_PROTOCOL)
+    digest = _digest(payload)
+    if digest == _saved_digest[0] and os.path.exists(BASELINE_FILE):
+        return  # identical to what is already on disk
+
+    # Write-then-rename so a crash mid-write never leaves a truncated baseline
+    tmp = BASELINE_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, BASELINE_FILE)
+    _load_cache[:] = [os.stat(BASELINE_FILE).st_mtime_ns, b]
+    _saved_digest[0] = digest
+
+    if DEBUG_MODE:
+        dump_baseline_json(plain)
+
+def dump_baseline_json(b):
+    if orjson is not None:
+        payload = orjson.dumps(b, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(b, indent=2).encode()
+    with open(BASELINE_DEBUG_FILE, "wb") as f:
+        f.write(payload)
+
+# The baseline lives in memory across scans and is flushed to disk at exit when dirty.
+# Only a scan that ran to completion marks it dirty; a failed scan's in-place edits are
+# thrown away with discard_baseline(), so neither the flush nor the next scan sees them.
+_baseline = None
+_baseline_dirty = False
+
+def get_baseline():
+    # Re-check the file only while clean: a stat() when unchanged, a re-parse if edited externally
+    global _baseline
+    if _baseline is None or not _baseline_dirty:
+        _baseline = load_baseline()
+    return _baseline
+
+def mark_baseline_dirty():
+    global _baseline_dirty
+    _baseline_dirty = True
+
+def discard_baseline():
+    # Drop in-memory state a scan may have left half-updated. load_baseline() memoizes the parsed
+    # object by mtime — the same object the scan mutated — so clear that too to force a re-read.
+    global _baseline, _baseline_dirty
+    _baseline = None
+    _baseline_dirty = False
+    _load_cache[:] = [None, None]
+
+def flush_baseline():
+    global _baseline_dirty
+    if _baseline is not None and _baseline_dirty:
+        save_baseline(_baseline)
+        _baseline_dirty = False
+
+atexit.register(flush_baseline)
+
+def reset_day(b, today=None):
+    if today is None:
+        today = now_ist().date().isoformat()
     if b.get("date") != today:
         b["date"] = today
         b["started"] = False
         b["day_open"] = None
         b["data"] = {}
-        save_baseline(b)
     return b
 
 # ================= EXPIRY =================
-def expiry_to_symbol_format(date_str):
-    d = datetime.strptime(date_str, "%d-%m-%Y")
-    year_short = d.strftime("%y")
-    month_short = d.strftime("%b").upper()
-    return year_short + month_short
+_MONTHS = ("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC")
 
-def get_monthly_expiry(expiry_info):
-    today = now_ist().date()
+@functools.lru_cache(maxsize=16)
+def expiry_to_symbol_format(date_str):
+    # "DD-MM-YYYY" → "YYMON" (e.g. "27-01-2026" → "26JAN")
+    _, month, year = date_str.split("-")
+    return year[-2:] + _MONTHS[int(month) - 1]
+
+@functools.lru_cache(maxsize=2)
+def _select_expiry(today_iso, expiries):
+    # Pure in (trading day, expiry list) — parsed once per day instead of every scan
+    today = datetime.fromisoformat(today_iso).date()
     valid_expiries = []
 
-    print("DEBUG - All expiry_info from API:", expiry_info)
-
-    for e in expiry_info:
+    for expiry_ts, date_str in expiries:
         try:
-            exp = datetime.fromtimestamp(int(e["expiry"]), tz=IST).date()
+            exp = datetime.fromtimestamp(int(expiry_ts), tz=IST).date()
             days = (exp - today).days
-            print(f"Expiry {e['date']}: {exp} → {days} days left")
+            log.debug("Expiry %s: %s → %d days left", date_str, exp, days)
             if days >= 0:
-                valid_expiries.append((days, e["date"]))
+                valid_expiries.append((days, date_str))
         except Exception as ex:
-            print("Expiry parse error:", ex)
+            log.warning("Expiry parse error: %s", ex)
             continue
 
     if not valid_expiries:
-        print("No valid expiry found")
         return None, None
 
     nearest_days, nearest_date = min(valid_expiries, key=lambda x: x[0])
-    print(f"SELECTED EXPIRY: {nearest_date} ({nearest_days} days left)")
+    return nearest_date, nearest_days
+
+def get_monthly_expiry(expiry_info, today=None):
+    if today is None:
+        today = now_ist().date().isoformat()
+    expiries = tuple((e.get("expiry"), e.get("date")) for e in expiry_info)
+    nearest_date, nearest_days = _select_expiry(today, expiries)
+
+    if nearest_date is None:
+        log.warning("No valid expiry found")
+        return None, None
+
+    log.debug("SELECTED EXPIRY: %s (%d days left)", nearest_date, nearest_days)
     return nearest_date, nearest_days
 
 # ================= STRIKE SELECTION =================
@@ -159,22 +389,42 @@ def select_trade_strike(atm, buildup_type):
         return atm + 100, "CE"
 
 # ================= SCAN =================
+# Per-row columns gathered from the chain and the baseline in one pass
+_ROW_DTYPE = np.dtype([
+    ("strike", np.int64),
+    ("oi", np.int64),
+    ("ltp", np.float64),
+    ("vol", np.int64),
+    ("base_oi", np.int64),
+    ("base_ltp", np.float64),
+    ("base_vol", np.int64),
+    ("prev_oi", np.int64),
+])
+
 def scan():
-    if CHECK_MARKET_HOURS and not is_market_open():
-        print("⏱ Market closed")
+    try:
+        _scan()
+    except BaseException:
+        # _scan mutates the baseline in place; never let the atexit flush persist a partial scan
+        discard_baseline()
+        raise
+    finally:
+        flush_telegram()
+        _log_buffer.flush()
+
+def _scan():
+    # One clock read per scan — every time check below refers to the same moment
+    now = now_ist()
+    now_t = now.time()
+    today = now.date().isoformat()
+
+    if CHECK_MARKET_HOURS and not is_market_open(now_t):
+        log.info("⏱ Market closed")
         return
 
-    baseline = reset_day(load_baseline())
-
-    spot = get_banknifty_spot()
-    if spot is None:
-        print("⚠ BANKNIFTY spot unavailable — skipping scan")
-        return
-
-    if baseline["day_open"] is None:
-        baseline["day_open"] = spot
-
-    atm = int(round(spot / 100) * 100)
+    baseline = get_baseline()
+    new_day = baseline.get("date") != today
+    reset_day(baseline, today)
 
     chain_resp = safe_api_call(fyers.optionchain, {
         "symbol": "NSE:NIFTYBANK-INDEX",
@@ -182,203 +432,224 @@ def scan():
         "timestamp": ""
     })
     if not chain_resp:
-        print("Option chain API call returned None")
+        log.warning("Option chain API call returned None")
         return
 
-    print("Optionchain response status:", chain_resp.get("s"))
-    print("Full chain_resp keys:", list(chain_resp.keys()))
+    log.debug("Optionchain response status: %s", chain_resp.get("s"))
+    log.debug("Full chain_resp keys: %s", list(chain_resp.keys()))
 
     if chain_resp.get("s") != "ok":
-        print(f"Optionchain failed: {chain_resp.get('message', 'Unknown')}")
+        log.warning("Optionchain failed: %s", chain_resp.get("message", "Unknown"))
         return
 
     raw = chain_resp["data"]["optionsChain"]
     expiry_info = chain_resp["data"]["expiryData"]
 
     if not raw:
-        print("No optionsChain data returned")
+        log.warning("No optionsChain data returned")
         return
 
-    expiry_result = get_monthly_expiry(expiry_info)
-    if not expiry_result:
-        print("No suitable monthly expiry found")
+    # The chain carries the index quote; only fall back to a separate quotes call without it
+    spot = spot_from_chain(raw) or get_banknifty_spot()
+    if spot is None:
+        log.warning("⚠ BANKNIFTY spot unavailable — skipping scan")
         return
-    
-    expiry_date, days_to_expiry = expiry_result
-    expiry = expiry_to_symbol_format(expiry_date)
 
-    # Static thresholds - let filters handle quality control
-    print(f"Days to expiry: {days_to_expiry} → Static thresholds: WATCH {WATCH_OI_PCT}%, EXEC {EXEC_OI_PCT}%")
-
-    df = pd.DataFrame(raw)
-    
-    # Apply expiry filter FIRST
-    df = df[df["symbol"].str.contains(expiry, regex=False)]
-    
-    # Then strike range
-    df = df[
-        (df["strike_price"].between(atm - STRIKE_RANGE, atm + STRIKE_RANGE)) &
-        (df["strike_price"] % 100 == 0)
-    ]
+    updated = new_day
 
-    print(f"Selected monthly expiry date: {expiry_date}")
-    print(f"Expiry filter string: {expiry}")
-    print(f"Total raw options: {len(raw)}")
-    print(f"After expiry filter: {len(df[df['symbol'].str.contains(expiry)])}")
-    print(f"After strike range filter: {len(df)}")
-    print(f"Number of valid CE/PE rows: {len(df[df['option_type'].isin(['CE', 'PE'])])}")
-
-    # === Pre-compute OI % for opposite-side & conflict checks ===
-    strike_oi_changes = {}   # strike -> {"CE": pct, "PE": pct}
-    current_oi_map = {}      # (strike, opt) -> current_oi
-
-    for _, r in df.iterrows():
-        strike = int(r.get("strike_price", 0))
-        opt    = r.get("option_type", "")
-        oi     = int(r.get("oi", 0))
-
-        if strike == 0 or opt not in ("CE", "PE"):
-            continue
-
-        # Store current OI for later lookup
-        current_oi_map[(strike, opt)] = oi
+    if baseline["day_open"] is None:
+        baseline["day_open"] = spot
+        updated = True
 
-        key = f"{opt}_{strike}"
-        entry = baseline["data"].get(key)
-        if entry is None or entry.get("base_oi", 0) < MIN_BASE_OI:
-            continue
+    atm = (int(spot) + 50) // 100 * 100  # half-up to the nearest 100, integer-only
 
-        base_oi = entry["base_oi"]
-        oi_pct  = ((oi - base_oi) / base_oi) * 100 if base_oi > 0 else 0
+    expiry_date, days_to_expiry = get_monthly_expiry(expiry_info, today)
+    if expiry_date is None:
+        log.warning("No suitable monthly expiry found")
+        return
 
-        if strike not in strike_oi_changes:
-            strike_oi_changes[strike] = {}
-        strike_oi_changes[strike][opt] = oi_pct
+    expiry = expiry_to_symbol_format(expiry_date)
 
-    updated = False
+    # Static thresholds - let filters handle quality control
+    log.debug("Days to expiry: %d → Static thresholds: WATCH %d%%, EXEC %d%%", days_to_expiry, WATCH_OI_PCT, EXEC_OI_PCT)
+
+    # Filter the raw chain directly — a DataFrame buys nothing for a few hundred rows
+    # FYERS option symbols are "NSE:BANKNIFTY<YY><MON><STRIKE><CE|PE>", so the expiry
+    # sits at a fixed offset — one prefix compare instead of a substring search
+    expiry_prefix = f"NSE:BANKNIFTY{expiry}"
+    lo, hi = atm - STRIKE_RANGE, atm + STRIKE_RANGE
+    rows = [
+        r for r in raw
+        if r.get("symbol", "").startswith(expiry_prefix)
+        and lo <= r.get("strike_price", 0) <= hi
+        and r["strike_price"] % 100 == 0
+        and r.get("option_type") in ("CE", "PE")
+    ]
 
-    for _, r in df.iterrows():
-        strike = int(r.get("strike_price", 0))
-        opt    = r.get("option_type", "")
+    log.debug("Selected monthly expiry date: %s", expiry_date)
+    log.debug("Expiry filter prefix: %s", expiry_prefix)
+    log.debug("Total raw options: %d", len(raw))
+    log.debug("After expiry + strike range filter (valid CE/PE rows): %d", len(rows))
+
+    # === Single fused pass: resolve baseline entries, gather columns, roll prev_oi ===
+    bdata = baseline["data"]
+    known = len(bdata)
+    recs, opts, states, entries = [], [], [], []
+    # Bound methods and the entry class as locals — the loop body does no global/attribute lookups for them
+    bdata_get, new_entry = bdata.get, StrikeEntry
+    add_rec, add_opt, add_state, add_entry = recs.append, opts.append, states.append, entries.append
+
+    for r in rows:
+        strike = int(r["strike_price"])
+        opt    = r["option_type"]
         oi     = int(r.get("oi", 0))
         ltp    = float(r.get("ltp", 0))
         vol    = int(r.get("volume", 0))
 
-        if strike == 0 or opt not in ("CE", "PE"):
-            continue
-
         key = f"{opt}_{strike}"
-        entry = baseline["data"].setdefault(key, {
-            "base_oi": oi,
-            "base_ltp": ltp,
-            "base_vol": vol,
-            "prev_oi": oi,
-            "state": "NONE"
-        })
-
-        if entry["base_oi"] < MIN_BASE_OI:
-            continue
+        entry = bdata_get(key)
+        if entry is None:
+            entry = bdata[key] = new_entry(oi, ltp, vol, oi)
+        prev_oi = entry.prev_oi
+        add_rec((strike, oi, ltp, vol, entry.base_oi, entry.base_ltp, entry.base_vol, prev_oi))
+        add_opt(opt)
+        add_state(entry.state)
+        add_entry(entry)
+
+        # prev_oi for the next scan; this scan's value is already captured in recs
+        if prev_oi != oi:
+            entry.prev_oi = oi
+            updated = True
+
+    if len(bdata) != known:
+        updated = True
 
-        oi_pct = ((oi - entry["base_oi"]) / entry["base_oi"]) * 100
-        ltp_change_pct = ((ltp - entry["base_ltp"]) / entry["base_ltp"] * 100) if entry["base_ltp"] > 0 else 0
-        vol_ok = vol > entry["base_vol"] * VOL_MULTIPLIER
+    rec      = np.array(recs, dtype=_ROW_DTYPE)
+    strikes  = rec["strike"]
+    ois      = rec["oi"]
+    base_oi  = rec["base_oi"]
+    base_ltp = rec["base_ltp"]
+    state    = np.array(states, dtype=object)
+
+    tracked = base_oi >= MIN_BASE_OI
+    oi_pct = np.where(tracked, (ois - base_oi) / np.maximum(base_oi, 1) * 100, 0.0)
+    ltp_change_pct = np.where(base_ltp > 0, (rec["ltp"] - base_ltp) / np.where(base_ltp > 0, base_ltp, 1) * 100, 0.0)
+    vol_ok = rec["vol"] > rec["base_vol"] * VOL_MULTIPLIER
+    is_short_buildup = (oi_pct >= EXEC_OI_PCT) & (ltp_change_pct <= PREMIUM_MAX_RISE)
+
+    watch_mask = tracked & (oi_pct >= WATCH_OI_PCT) & (state == "NONE")
+    exec_mask  = tracked & is_short_buildup & ((state == "WATCH") | watch_mask)
+
+    # Flat per-strike lookups: slot = (strike - lo) // 100 over the ±STRIKE_RANGE window.
+    # A missing side reads as row -1 / 0% so the conflict and opposite-side checks are plain indexing.
+    n_slots = 2 * STRIKE_RANGE // 100 + 1
+    slot = (strikes - lo) // 100
+    is_ce = np.array(opts) == "CE"
+    ce_row = np.full(n_slots, -1)
+    pe_row = np.full(n_slots, -1)
+    ce_row[slot[is_ce]] = np.flatnonzero(is_ce)
+    pe_row[slot[~is_ce]] = np.flatnonzero(~is_ce)
+    opp_row = np.where(is_ce, pe_row[slot], ce_row[slot])
+    ce_pct = np.zeros(n_slots)
+    pe_pct = np.zeros(n_slots)
+    ce_pct[slot[is_ce]] = oi_pct[is_ce]
+    pe_pct[slot[~is_ce]] = oi_pct[~is_ce]
+    conflicted = (ce_pct[slot] >= OI_BOTH_SIDES_AVOID) & (pe_pct[slot] >= OI_BOTH_SIDES_AVOID)
+
+    # Loop invariant — the spot move since open is the same for every candidate
+    day_open = baseline["day_open"]
+    spot_move = abs(spot - day_open) / day_open * 100
+
+    # Alert fragments that don't depend on the strike — formatted once, not per alert
+    watch_footer = f"Spot: {spot:.0f}  ATM: {atm}"
+    spot_move_line = f"Spot Move: {spot_move:.2f}%   Vol ↑"
+    trade_side = {"CE": select_trade_strike(atm, "CE"), "PE": select_trade_strike(atm, "PE")}
+
+    # Only rows that crossed a threshold need Python-level follow-up
+    for i in np.flatnonzero(watch_mask | exec_mask):
+        entry  = entries[i]
+        strike = int(strikes[i])
+        opt    = opts[i]
 
         # ================= WATCH =================
-        if oi_pct >= WATCH_OI_PCT and entry["state"] == "NONE":
-            send_telegram(
+        if watch_mask[i]:
+            queue_telegram(
                 f"👁 *BN WATCH*\n"
                 f"{strike} {opt}\n"
-                f"OI +{oi_pct:.0f}%\n"
-                f"Spot: {spot:.0f}  ATM: {atm}"
+                f"OI +{oi_pct[i]:.0f}%\n"
+                f"{watch_footer}"
             )
-            entry["state"] = "WATCH"
+            entry.state = "WATCH"
             updated = True
 
         # ================= EXECUTION =================
-        is_short_buildup = (oi_pct >= EXEC_OI_PCT) and (ltp_change_pct <= PREMIUM_MAX_RISE)
-
-        if is_short_buildup and entry["state"] == "WATCH":
-            if not after_1015():
+        if exec_mask[i]:
+            if not after_1015(now_t):
                 continue
 
-            spot_move = abs(spot - baseline["day_open"]) / baseline["day_open"] * 100
-            if spot_move < SPOT_MOVE_PCT or not vol_ok:
+            if spot_move < SPOT_MOVE_PCT or not vol_ok[i]:
                 continue
 
             # ─── Conflict check ───
-            ce_pct_here = strike_oi_changes.get(strike, {}).get("CE", 0)
-            pe_pct_here = strike_oi_changes.get(strike, {}).get("PE", 0)
-            conflicted = (ce_pct_here >= OI_BOTH_SIDES_AVOID and pe_pct_here >= OI_BOTH_SIDES_AVOID)
-
-            if conflicted:
-                print(f"⛔ Skipping conflicted BN buildup at {strike}: both sides +{ce_pct_here:.0f}% / +{pe_pct_here:.0f}%")
+            if conflicted[i]:
+                log.debug("⛔ Skipping conflicted BN buildup at %d: both sides +%.0f%% / +%.0f%%",
+                          strike, ce_pct[slot[i]], pe_pct[slot[i]])
                 continue
 
             # ─── DUAL DECLINE CHECK (UPDATED) ───
             opp_opt = "PE" if opt == "CE" else "CE"
-            opp_key = f"{opp_opt}_{strike}"
-            opp_entry = baseline["data"].get(opp_key)
-
-            if opp_entry:
-                opp_current_oi = current_oi_map.get((strike, opp_opt), 0)
-                
-                if opp_current_oi == 0:
-                    print(f"⚠️ No current data for opposite {opp_opt} at {strike}")
-                    continue
-                
-                opp_prev_oi = opp_entry.get("prev_oi", opp_entry.get("base_oi", 0))
-                opp_baseline_oi = opp_entry.get("base_oi", 0)
-                
-                # Calculate BOTH scan-to-scan and cumulative declines
-                opp_decline_pct = ((opp_current_oi - opp_prev_oi) / opp_prev_oi * 100) if opp_prev_oi > 0 else 0
-                opp_cumulative_decline = ((opp_current_oi - opp_baseline_oi) / opp_baseline_oi * 100) if opp_baseline_oi > 0 else 0
-                
-                # Check EITHER scan-to-scan decline OR significant cumulative unwinding
-                scan_to_scan_covering = (opp_current_oi < opp_prev_oi) and (opp_decline_pct <= MIN_DECLINE_PCT)
-                already_unwound = opp_cumulative_decline <= MIN_CUMULATIVE_DECLINE_PCT
-
-                is_covering = scan_to_scan_covering or already_unwound
-                
-                if not is_covering:
-                    print(f"⚠️ BN Rejected {strike} {opt}: opposite {opp_opt} not covering")
-                    print(f"   Scan-to-scan: {opp_decline_pct:+.2f}% (need <= {MIN_DECLINE_PCT}%)")
-                    print(f"   Cumulative: {opp_cumulative_decline:+.2f}% (need <= {MIN_CUMULATIVE_DECLINE_PCT}%)")
-                    continue
-                
-                # Use the more significant decline for display
-                opp_decline_display = min(opp_decline_pct, opp_cumulative_decline)
-                
-                print(f"✓ BN Covering detected at {strike} {opt}: {opp_opt} {opp_decline_display:.1f}% "
-                      f"(scan: {opp_decline_pct:+.2f}%, cumulative: {opp_cumulative_decline:+.2f}%) "
-                      f"({opp_prev_oi:,} → {opp_current_oi:,})")
-                
-                # Valid signal
-                trade_strike, trade_opt = select_trade_strike(atm, opt)
-
-                send_telegram(
-                    f"🚀 *BANK NIFTY EXECUTION - {opt} BUILDUP*\n"
-                    f"Buy {trade_strike} {trade_opt}\n\n"
-                    f"Qualifying {opt} @ {strike}: +{oi_pct:.0f}% (opp {opp_opt} {opp_decline_display:+.1f}%)\n"
-                    f"Spot Move: {spot_move:.2f}%   Vol ↑"
-                )
-                entry["state"] = "EXECUTED"
-                updated = True
-            else:
-                print(f"⚠️ BN No opposite side entry for {strike} {opt}")
+            opp_i = opp_row[i]
 
-    # Update prev_oi for all entries (for next scan)
-    for _, r in df.iterrows():
-        strike = int(r.get("strike_price", 0))
-        opt = r.get("option_type", "")
-        oi = int(r.get("oi", 0))
-        key = f"{opt}_{strike}"
+            if opp_i < 0 or ois[opp_i] == 0:
+                log.debug("⚠️ No current data for opposite %s at %d", opp_opt, strike)
+                continue
 
-        if key in baseline["data"]:
-            baseline["data"][key]["prev_oi"] = oi
+            opp_current_oi = int(ois[opp_i])
+            opp_prev_oi = int(rec["prev_oi"][opp_i])
+            opp_baseline_oi = int(base_oi[opp_i])
+
+            # Calculate BOTH scan-to-scan and cumulative declines
+            opp_decline_pct = ((opp_current_oi - opp_prev_oi) / opp_prev_oi * 100) if opp_prev_oi > 0 else 0
+            opp_cumulative_decline = ((opp_current_oi - opp_baseline_oi) / opp_baseline_oi * 100) if opp_baseline_oi > 0 else 0
+
+            # Check EITHER scan-to-scan decline OR significant cumulative unwinding
+            scan_to_scan_covering = (opp_current_oi < opp_prev_oi) and (opp_decline_pct <= MIN_DECLINE_PCT)
+            already_unwound = opp_cumulative_decline <= MIN_CUMULATIVE_DECLINE_PCT
+
+            is_covering = scan_to_scan_covering or already_unwound
+
+            if not is_covering:
+                log.debug("⚠️ BN Rejected %d %s: opposite %s not covering\n"
+                          "   Scan-to-scan: %+.2f%% (need <= %s%%)\n"
+                          "   Cumulative: %+.2f%% (need <= %s%%)",
+                          strike, opt, opp_opt,
+                          opp_decline_pct, MIN_DECLINE_PCT,
+                          opp_cumulative_decline, MIN_CUMULATIVE_DECLINE_PCT)
+                continue
+
+            # Use the more significant decline for display
+            opp_decline_display = min(opp_decline_pct, opp_cumulative_decline)
+
+            if DEBUG_MODE:  # the thousands-separated OI args are formatted eagerly
+                log.debug("✓ BN Covering detected at %d %s: %s %.1f%% (scan: %+.2f%%, cumulative: %+.2f%%) (%s → %s)",
+                          strike, opt, opp_opt, opp_decline_display,
+                          opp_decline_pct, opp_cumulative_decline,
+                          f"{opp_prev_oi:,}", f"{opp_current_oi:,}")
+
+            # Valid signal
+            trade_strike, trade_opt = trade_side[opt]
+
+            queue_telegram(
+                f"🚀 *BANK NIFTY EXECUTION - {opt} BUILDUP*\n"
+                f"Buy {trade_strike} {trade_opt}\n\n"
+                f"Qualifying {opt} @ {strike}: +{oi_pct[i]:.0f}% (opp {opp_opt} {opp_decline_display:+.1f}%)\n"
+                f"{spot_move_line}"
+            )
+            entry.state = "EXECUTED"
             updated = True
 
     if not baseline["started"]:
-        send_telegram(
+        queue_telegram(
             f"✅ *BANK NIFTY OI MONITOR STARTED*\n"
             f"Spot: {spot:.0f}   ATM: {atm}\n"
             f"Monthly expiry: {expiry_date}\n"
@@ -387,13 +658,13 @@ def scan():
         baseline["started"] = True
         updated = True
         
-    if updated or baseline["data"]:
+    if updated:
         if not baseline["data"]:
-            print("WARNING: Processed rows but no baseline entries added (check MIN_BASE_OI or expiry)")
-        save_baseline(baseline)
-        print("Baseline saved — entries count:", len(baseline["data"]))
+            log.warning("WARNING: Processed rows but no baseline entries added (check MIN_BASE_OI or expiry)")
+        mark_baseline_dirty()
+        log.info("Baseline updated — entries count: %d", len(baseline["data"]))
     else:
-        print("No changes/alerts — baseline not saved this run")
+        log.info("No changes/alerts — baseline unchanged this run")
 
 # ================= ENTRY =================
 if __name__ == "__main__":